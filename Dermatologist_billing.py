@@ -1,13 +1,55 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+from functools import partial
 import tempfile
+import atexit
 import os
+import shutil
 import platform
 import subprocess
 import json
 import re
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Prefer orjson for (de)serialization; fall back to the stdlib
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj, indent=4).encode("utf-8")
+
+# well-formed YYYY-MM-DD; such strings sort chronologically
+_ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+_BY_DATE = itemgetter("date")
+
+# phone basic validation: allow digits, plus, spaces, dashes
+_PHONE_RE = re.compile(r"^[+\d][\d\s\-+()]{5,}$")
+# anything other than letters, digits, underscore and space is stripped from file names
+_UNSAFE_NAME = re.compile(r"[^\w ]+")
+
+def _is_iso_date(s):
+    # strict zero-padded YYYY-MM-DD naming a real day; only these compare correctly as strings
+    digits = s[:4] + s[5:7] + s[8:]
+    if len(s) != 10 or s[4] != "-" or s[7] != "-" or not (digits.isascii() and digits.isdigit()):
+        return False
+    try:
+        date(int(s[:4]), int(s[5:7]), int(s[8:]))
+    except ValueError:
+        return False
+    return True
 
 # === Abstraction: Base class defining what a Treatment should have ===
 class Treatment(ABC):
@@ -33,6 +75,14 @@ class GenericTreatment(Treatment):
 
 # === Patient Class (Encapsulation of patient data) ===
 class Patient:
+    _WIDTH = 60
+    _EQ = "=" * _WIDTH
+    _DASH = "-" * _WIDTH
+    _BILL_HEADER = f"{_EQ}\n{' Reimagine Hair Transplant & Skin Care Clinic ':^{_WIDTH}}\n{_EQ}"
+    _BILL_COLUMNS = f"{_DASH}\n{'Treatment':<35}{'Cost (Rs.)':>20}\n{_DASH}"
+    _BILL_FOOTER = f"{_EQ}\n{'Thank you for choosing our clinic!':^{_WIDTH}}\n{_EQ}"
+    _RX_HEADER = f"{_EQ}\n{' Prescription ':^{_WIDTH}}\n{_EQ}"
+
     def __init__(self, name, phone, patient_type="Normal", vip_discount=10):
         self.__name = name
         self.__phone = phone
@@ -50,66 +100,72 @@ class Patient:
     def get_prescription(self):
         return self.__prescription
 
-    def get_bill_text(self):
-        width = 60
-        now = datetime.now().strftime("%d-%m-%Y %I:%M %p")
-
-        lines = []
-        lines.append("=" * width)
-        lines.append(f"{' Reimagine Hair Transplant & Skin Care Clinic ':^{width}}")
-        lines.append("=" * width)
-        lines.append(f"Patient Name : {self.__name}")
-        lines.append(f"Phone Number : {self.__phone}")
-        lines.append(f"Patient Type : {self.__patient_type}")
-        lines.append(f"Date & Time  : {now}")
-        lines.append("-" * width)
-        lines.append(f"{'Treatment':<35}{'Cost (Rs.)':>20}")
-        lines.append("-" * width)
+    def get_bill_text(self, now=None):
+        if now is None:
+            now = datetime.now()
+        now = now.strftime("%d-%m-%Y %I:%M %p")
 
+        # one pass: formatted item lines and the running total
         total = 0
+        item_lines = []
+        line_fmt = "{:<35}{:>20}\n".format
         for t in self.__treatments:
-            lines.append(f"{t.get_name():<35}{t.get_cost():>20}")
-            total += t.get_cost()
+            cost = t.get_cost()
+            total += cost
+            item_lines.append(line_fmt(t.get_name(), cost))
+        items_block = "".join(item_lines)
 
-        discount = 0
-        if self.__patient_type == "VIP":
-            discount = total * (self.__vip_discount / 100)
-            total_after_discount = total - discount
-        else:
-            total_after_discount = total
+        discount = total * (self.__vip_discount / 100) if self.__patient_type == "VIP" else 0
+        total_after_discount = total - discount
 
-        lines.append("-" * width)
+        discount_block = ""
         if discount > 0:
-            lines.append(f"{'Subtotal':<35}{total:>20.2f}")
-            lines.append(f"{f'VIP Discount ({self.__vip_discount}%)':<35}{-discount:>20.2f}")
-        lines.append(f"{'Total Bill':<35}{total_after_discount:>20.2f}")
-        lines.append("=" * width)
-        lines.append(f"{'Thank you for choosing our clinic!':^{width}}")
-        lines.append("=" * width)
-
-        return "\n".join(lines)
-
-    def get_prescription_text(self):
-        width = 60
-        now = datetime.now().strftime("%d-%m-%Y %I:%M %p")
-
-        lines = []
-        lines.append("=" * width)
-        lines.append(f"{' Prescription ':^{width}}")
-        lines.append("=" * width)
-        lines.append(f"Patient Name : {self.__name}")
-        lines.append(f"Phone Number : {self.__phone}")
-        lines.append(f"Date & Time  : {now}")
-        lines.append("-" * width)
-        lines.append(self.__prescription if self.__prescription else "No prescription provided.")
-        lines.append("=" * width)
-
-        return "\n".join(lines)
+            discount_block = (
+                f"{'Subtotal':<35}{total:>20.2f}\n"
+                f"{f'VIP Discount ({self.__vip_discount}%)':<35}{-discount:>20.2f}\n"
+            )
+
+        return (
+            f"{self._BILL_HEADER}\n"
+            f"Patient Name : {self.__name}\n"
+            f"Phone Number : {self.__phone}\n"
+            f"Patient Type : {self.__patient_type}\n"
+            f"Date & Time  : {now}\n"
+            f"{self._BILL_COLUMNS}\n"
+            f"{items_block}"
+            f"{self._DASH}\n"
+            f"{discount_block}"
+            f"{'Total Bill':<35}{total_after_discount:>20.2f}\n"
+            f"{self._BILL_FOOTER}"
+        )
+
+    def get_prescription_text(self, now=None):
+        if now is None:
+            now = datetime.now()
+        now = now.strftime("%d-%m-%Y %I:%M %p")
+
+        return (
+            f"{self._RX_HEADER}\n"
+            f"Patient Name : {self.__name}\n"
+            f"Phone Number : {self.__phone}\n"
+            f"Date & Time  : {now}\n"
+            f"{self._DASH}\n"
+            f"{self.__prescription if self.__prescription else 'No prescription provided.'}\n"
+            f"{self._EQ}"
+        )
 
 # === Main GUI Application ===
 class ClinicApp:
     TREATMENTS_FILE = "treatments.json"
+    APPOINTMENTS_DB = "appointments.db"
+    # JSON export of the appointments table, kept as a human-readable backup
     APPOINTMENTS_FILE = "appointments.json"
+    # the pre-database JSON store, moved aside if it has to wait for a later import
+    APPOINTMENTS_LEGACY_FILE = "appointments.json.bak"
+    FLUSH_DELAY_MS = 5000
+    SEARCH_DELAY_MS = 120
+    REFRESH_DELAY_MS = 50
+    IO_POLL_MS = 20
 
     def __init__(self, root):
         self.root = root
@@ -119,6 +175,32 @@ class ClinicApp:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(4, weight=1)
 
+        # Parsed treatments JSON, keyed on (st_mtime_ns, st_size) of the file
+        self._treat_cache = None
+        self._treat_cache_key = None
+        # Appointments live in SQLite, indexed by date
+        # set when the legacy JSON store exists but could not be imported yet
+        self._appt_import_pending = False
+        try:
+            self._db = self._open_appointments_db()
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to open appointments:\n{e}")
+            # a closed connection makes every later query raise sqlite3.Error, which callers report
+            self._db = sqlite3.connect(":memory:")
+            self._db.close()
+        # separate read connection owned by the I/O worker thread, opened on first use
+        self._reader_db = None
+        # Pending writes are batched and flushed at most every FLUSH_DELAY_MS
+        self._treat_dirty = False
+        self._appt_dirty = False
+        self._flush_after_id = None
+        # per-session directory for print temp files, removed on close
+        self._print_tmpdir = None
+        # single background worker for record files, so disk latency stays off the Tk thread
+        self._io_executor = ThreadPoolExecutor(max_workers=1)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        atexit.register(self._flush_all)
+
         # Load treatments (if file missing, start with defaults)
         self.treatments_dict = self.load_treatments()
         if not self.treatments_dict:
@@ -127,35 +209,104 @@ class ClinicApp:
             }
             self.save_treatments()
 
-        self.patient = None
+        # (bill_text, prescription_text) as last displayed, reused by print/save
+        self._last_output = None
         self.selected_treatments = []
+        self._selected_set = set()
+        # treatment names in listbox order, so a listbox index maps straight to a name
+        self._listbox_names = []
         self.treatment_price_vars = {}
+        # treatment name -> (Label, Entry) row currently shown in the selected frame
+        self._selected_rows = {}
 
         self.create_widgets()
 
-        # Check reminders for tomorrow
-        self.check_appointments_reminder()
+        # Check reminders for tomorrow once the window has been drawn
+        self.root.after_idle(self.check_appointments_reminder)
 
     # --------------------
     # Treatments persistence
     # --------------------
+    @staticmethod
+    def _file_key(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
     def load_treatments(self):
-        if os.path.exists(self.TREATMENTS_FILE):
-            try:
-                with open(self.TREATMENTS_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return {str(k): int(v) for k, v in data.items()}
-            except Exception:
-                return {}
-        return {}
+        if self._treat_dirty:
+            return dict(self._treat_cache)
+        # the stat for the cache key doubles as the existence check
+        try:
+            key = self._file_key(self.TREATMENTS_FILE)
+            if key != self._treat_cache_key:
+                with open(self.TREATMENTS_FILE, "rb") as f:
+                    data = _loads(f.read())
+                self._treat_cache = {str(k): int(v) for k, v in data.items()}
+                self._treat_cache_key = key
+            return dict(self._treat_cache)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            messagebox.showwarning("Warning", f"Could not read {self.TREATMENTS_FILE}, starting with no treatments:\n{e}")
+            return {}
 
     def save_treatments(self):
+        self._treat_cache = dict(self.treatments_dict)
+        self._treat_dirty = True
+        self._schedule_flush()
+
+    def _flush_treatments(self):
+        if not self._treat_dirty:
+            return
         try:
-            with open(self.TREATMENTS_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.treatments_dict, f, indent=4)
+            self._atomic_write_json(self.TREATMENTS_FILE, self._treat_cache)
+            self._treat_cache_key = self._file_key(self.TREATMENTS_FILE)
+            self._treat_dirty = False
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save treatments:\n{e}")
 
+    # --------------------
+    # Batched flush to disk
+    # --------------------
+    @staticmethod
+    def _atomic_write_json(path, obj):
+        # write a sibling temp file and swap it in, so readers never see a truncated file
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_dumps(obj))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _schedule_flush(self):
+        if self._flush_after_id is None:
+            self._flush_after_id = self.root.after(self.FLUSH_DELAY_MS, self._flush_all)
+
+    def _flush_all(self):
+        self._flush_after_id = None
+        self._flush_treatments()
+        self._flush_appts()
+
+    def _on_close(self):
+        if self._flush_after_id is not None:
+            self.root.after_cancel(self._flush_after_id)
+        self._flush_all()
+        self._io_executor.submit(self._close_reader_db)
+        self._io_executor.shutdown(wait=True)
+        # the connection is about to close; an exit-time flush could only fail against it
+        atexit.unregister(self._flush_all)
+        self._db.close()
+        if self._print_tmpdir is not None:
+            shutil.rmtree(self._print_tmpdir, ignore_errors=True)
+        self.root.destroy()
+
     # --------------------
     # UI creation
     # --------------------
@@ -222,7 +373,7 @@ class ClinicApp:
         ttk.Button(frame_buttons, text="Generate Bill & Prescription", command=self.generate_bill_prescription).grid(row=0, column=0, padx=5, sticky="ew")
         ttk.Button(frame_buttons, text="Print Bill & Prescription", command=self.print_bill_and_prescription).grid(row=0, column=1, padx=5, sticky="ew")
         ttk.Button(frame_buttons, text="Reset", command=self.reset_all).grid(row=0, column=2, padx=5, sticky="ew")
-        ttk.Button(frame_buttons, text="Exit", command=self.root.quit).grid(row=0, column=3, padx=5, sticky="ew")
+        ttk.Button(frame_buttons, text="Exit", command=self._on_close).grid(row=0, column=3, padx=5, sticky="ew")
 
         ttk.Button(frame_buttons, text="Save Bill & Prescription to TXT", command=self.save_to_txt).grid(row=1, column=0, padx=5, pady=5, sticky="ew")
         ttk.Button(frame_buttons, text="Book Appointment", command=self.book_appointment).grid(row=1, column=1, padx=5, pady=5, sticky="ew")
@@ -243,8 +394,8 @@ class ClinicApp:
     # --------------------
     def update_treatment_listbox(self):
         self.treatment_listbox.delete(0, tk.END)
-        for treatment_name, cost in self.treatments_dict.items():
-            self.treatment_listbox.insert(tk.END, f"{treatment_name} (Rs. {cost})")
+        self.treatment_listbox.insert(tk.END, *[f"{treatment_name} (Rs. {cost})" for treatment_name, cost in self.treatments_dict.items()])
+        self._listbox_names = list(self.treatments_dict)
 
     def add_selected_treatments(self):
         selected_indices = self.treatment_listbox.curselection()
@@ -252,22 +403,30 @@ class ClinicApp:
             messagebox.showwarning("No Selection", "Please select at least one treatment.")
             return
         for idx in selected_indices:
-            treatment_str = self.treatment_listbox.get(idx)
-            treatment_name = treatment_str.split(" (")[0]
-            if treatment_name not in self.selected_treatments:
+            treatment_name = self._listbox_names[idx]
+            if treatment_name not in self._selected_set:
+                self._selected_set.add(treatment_name)
                 self.selected_treatments.append(treatment_name)
         self.update_selected_treatments_display()
 
     def update_selected_treatments_display(self):
-        # Clear previous widgets
-        for widget in self.selected_treatments_frame.winfo_children():
-            widget.destroy()
-        self.treatment_price_vars.clear()
+        # Drop rows for treatments no longer selected
+        for t_name in [name for name in self._selected_rows if name not in self._selected_set]:
+            for widget in self._selected_rows.pop(t_name):
+                widget.destroy()
+            self.treatment_price_vars.pop(t_name, None)
+        # Create rows only for newly selected treatments; existing rows keep their widgets and price vars
         for i, t_name in enumerate(self.selected_treatments):
-            ttk.Label(self.selected_treatments_frame, text=t_name).grid(row=i, column=0, sticky="w", padx=5, pady=2)
-            price_var = tk.IntVar(value=self.treatments_dict.get(t_name, 0))
-            self.treatment_price_vars[t_name] = price_var
-            ttk.Entry(self.selected_treatments_frame, textvariable=price_var, width=12).grid(row=i, column=1, sticky="w", padx=5, pady=2)
+            row = self._selected_rows.get(t_name)
+            if row is None:
+                price_var = tk.IntVar(value=self.treatments_dict.get(t_name, 0))
+                self.treatment_price_vars[t_name] = price_var
+                row = (ttk.Label(self.selected_treatments_frame, text=t_name),
+                       ttk.Entry(self.selected_treatments_frame, textvariable=price_var, width=12))
+                self._selected_rows[t_name] = row
+            label, entry = row
+            label.grid(row=i, column=0, sticky="w", padx=5, pady=2)
+            entry.grid(row=i, column=1, sticky="w", padx=5, pady=2)
 
     def add_new_treatment(self):
         new_name = simpledialog.askstring("New Treatment", "Enter new treatment name:")
@@ -302,8 +461,8 @@ class ClinicApp:
         ttk.Label(popup, text="Select treatment(s) to remove:").pack(pady=5)
         listbox = tk.Listbox(popup, selectmode=tk.MULTIPLE)
         listbox.pack(expand=True, fill="both", padx=10, pady=5)
-        for t in self.treatments_dict.keys():
-            listbox.insert(tk.END, t)
+        names = list(self.treatments_dict)
+        listbox.insert(tk.END, *names)
 
         def on_remove():
             selected_indices = listbox.curselection()
@@ -311,10 +470,11 @@ class ClinicApp:
                 messagebox.showwarning("No Selection", "Please select at least one treatment to remove.")
                 return
             for idx in reversed(selected_indices):
-                treatment_name = listbox.get(idx)
+                treatment_name = names[idx]
                 if treatment_name in self.treatments_dict:
                     del self.treatments_dict[treatment_name]
-                if treatment_name in self.selected_treatments:
+                if treatment_name in self._selected_set:
+                    self._selected_set.discard(treatment_name)
                     self.selected_treatments.remove(treatment_name)
             self.save_treatments()
             self.update_treatment_listbox()
@@ -334,8 +494,7 @@ class ClinicApp:
         if not name or not phone:
             messagebox.showerror("Input Error", "Please enter patient name and phone number.")
             return
-        # phone basic validation: allow digits, plus, spaces, dashes
-        if not re.match(r"^[+\d][\d\s\-+()]{5,}$", phone):
+        if not _PHONE_RE.match(phone):
             if not messagebox.askyesno("Phone format", "Phone number looks unusual. Continue anyway?"):
                 return
         if not self.selected_treatments:
@@ -347,68 +506,81 @@ class ClinicApp:
         if patient_type != "VIP":
             vip_discount = 0
 
-        self.patient = Patient(name, phone, patient_type, vip_discount)
+        patient = Patient(name, phone, patient_type, vip_discount)
         for t_name in self.selected_treatments:
-            cost = self.treatment_price_vars[t_name].get()
+            try:
+                cost = self.treatment_price_vars[t_name].get()
+            except tk.TclError:
+                messagebox.showerror("Input Error", f"Price for {t_name} must be a whole number.")
+                return
             treatment_obj = GenericTreatment(t_name, cost)
-            self.patient.add_treatment(treatment_obj)
+            patient.add_treatment(treatment_obj)
 
         prescription_text = self.text_prescription.get("1.0", tk.END).strip()
-        self.patient.set_prescription(prescription_text)
+        patient.set_prescription(prescription_text)
 
-        bill_text = self.patient.get_bill_text()
-        prescription_text = self.patient.get_prescription_text()
+        # one timestamp for both documents and the record file name
+        now = datetime.now()
+        bill_text = patient.get_bill_text(now)
+        prescription_text = patient.get_prescription_text(now)
+        # only published once the bill is fully built, so print/save never see a half-made one
+        self._last_output = (bill_text, prescription_text)
 
         self.text_output.delete("1.0", tk.END)
         self.text_output.insert(tk.END, bill_text + "\n\n" + prescription_text)
 
         # Auto-save to records folder (date-wise)
-        date_folder = datetime.now().strftime("%Y-%m-%d")
+        date_folder = now.strftime("%Y-%m-%d")
         folder_path = os.path.join("records", date_folder)
-        os.makedirs(folder_path, exist_ok=True)
-        safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '_')).rstrip()
-        filename = f"{safe_name}_{datetime.now().strftime('%H%M%S')}.txt"
+        safe_name = _UNSAFE_NAME.sub("", name).rstrip()
+        filename = f"{safe_name}_{now.strftime('%H%M%S')}.txt"
         filepath = os.path.join(folder_path, filename)
+        self._io_executor.submit(self._write_record, folder_path, filepath, bill_text + "\n\n" + prescription_text)
+
+    @staticmethod
+    def _write_record(folder_path, filepath, text):
+        # runs on the I/O worker thread
+        tmp = filepath + ".tmp"
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(bill_text + "\n\n" + prescription_text)
+            os.makedirs(folder_path, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, filepath)
         except Exception:
             pass  # non-fatal
 
     def print_bill_and_prescription(self):
-        if not self.patient:
+        if self._last_output is None:
             messagebox.showerror("Error", "Generate bill and prescription first before printing.")
             return
-        combined_text = self.patient.get_bill_text() + "\n\n" + self.patient.get_prescription_text()
+        bill_text, prescription_text = self._last_output
+        combined_text = bill_text + "\n\n" + prescription_text
         self.print_text(combined_text)
 
     def print_text(self, text_content):
         # create a temp text file and send to default printer (platform-dependent)
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as f:
+        if self._print_tmpdir is None:
+            self._print_tmpdir = tempfile.mkdtemp(prefix="reimagine_print_")
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8', dir=self._print_tmpdir) as f:
             f.write(text_content)
             temp_filename = f.name
         try:
             if platform.system() == "Windows":
+                # the spooler reads the file asynchronously; it is purged with the session directory
                 os.startfile(temp_filename, 'print')
-            elif platform.system() == "Darwin":
-                subprocess.run(['lp', temp_filename])
-            else:  # Linux
-                subprocess.run(['lp', temp_filename])
+            else:  # macOS / Linux: lp copies the file into the CUPS queue before returning
+                subprocess.run(['lp', temp_filename], check=True)
+                os.remove(temp_filename)
             messagebox.showinfo("Success", "Document sent to printer")
         except Exception as e:
             messagebox.showerror("Print Error", f"Could not print: {str(e)}")
-        finally:
-            # remove after short delay
-            try:
-                self.root.after(5000, lambda: os.remove(temp_filename))
-            except Exception:
-                pass
 
     def save_to_txt(self):
-        if not self.patient:
+        if self._last_output is None:
             messagebox.showerror("Error", "Generate bill and prescription first before saving.")
             return
-        combined_text = self.patient.get_bill_text() + "\n\n" + self.patient.get_prescription_text()
+        bill_text, prescription_text = self._last_output
+        combined_text = bill_text + "\n\n" + prescription_text
         folder = "txt"
         os.makedirs(folder, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -428,28 +600,154 @@ class ClinicApp:
         self.text_prescription.delete("1.0", tk.END)
         self.text_output.delete("1.0", tk.END)
         self.selected_treatments.clear()
+        self._selected_set.clear()
         self.treatment_price_vars.clear()
         self.update_selected_treatments_display()
         self.treatment_listbox.selection_clear(0, tk.END)
-        self.patient = None
+        self._last_output = None
 
     # --------------------
     # Appointments persistence
     # --------------------
-    def load_appointments(self):
-        if os.path.exists(self.APPOINTMENTS_FILE):
+    def _connect_appointments_db(self):
+        db = sqlite3.connect(self.APPOINTMENTS_DB)
+        db.row_factory = sqlite3.Row
+        # WAL: a single-row write does not block readers or rewrite the database
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _open_appointments_db(self):
+        db = self._connect_appointments_db()
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS appointments ("
+                       "id TEXT PRIMARY KEY, name TEXT NOT NULL, phone TEXT NOT NULL, date TEXT NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS appointments_date ON appointments (date)")
+            # one-time import of the JSON store used before the database existed; a legacy file
+            # moved aside by an earlier export takes precedence over the export itself
+            if db.execute("PRAGMA user_version").fetchone()[0] == 0:
+                path = self.APPOINTMENTS_LEGACY_FILE if os.path.exists(self.APPOINTMENTS_LEGACY_FILE) else self.APPOINTMENTS_FILE
+                rows = self._read_appointments_json(path)
+                if rows is None:
+                    # leave user_version at 0 so the import is retried on the next start
+                    self._appt_import_pending = True
+                else:
+                    with db:
+                        db.executemany("INSERT OR IGNORE INTO appointments (id, name, phone, date) VALUES (?, ?, ?, ?)", rows)
+                        db.execute("PRAGMA user_version = 1")
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    @staticmethod
+    def _read_appointments_json(path):
+        # rows to import; [] when there is no legacy file, None when it exists but cannot be read
+        try:
+            with open(path, "rb") as f:
+                data = _loads(f.read())
+            if not isinstance(data, list):
+                raise ValueError("expected a list of appointments")
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            messagebox.showwarning("Warning", f"Could not import {path}; it will be retried on the next start:\n{e}")
+            return None
+        rows = []
+        for appt in data:
+            if not isinstance(appt, dict):
+                continue
+            date_str = str(appt.get("date", ""))
             try:
-                with open(self.APPOINTMENTS_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return []
-        else:
+                # the old booking form accepted unpadded dates such as 2030-1-5
+                date_str = datetime.strptime(date_str, "%Y-%m-%d").date().isoformat()
+            except ValueError:
+                pass
+            rows.append((str(appt.get("id") or uuid.uuid4().hex), str(appt.get("name", "")), str(appt.get("phone", "")), date_str))
+        return rows
+
+    def load_appointments(self, since=None, until=None, db=None):
+        # With `since`/`until` (dates, inclusive), only well-formed dates in that range are
+        # returned; this is a range scan on the date index. Rows come back in date order.
+        sql = "SELECT id, name, phone, date FROM appointments"
+        params = []
+        if since is not None or until is not None:
+            sql += " WHERE date GLOB ?"
+            params.append(_ISO_DATE_GLOB)
+            if since is not None:
+                sql += " AND date >= ?"
+                params.append(since.isoformat())
+            if until is not None:
+                sql += " AND date <= ?"
+                params.append(until.isoformat())
+        sql += " ORDER BY date, rowid"
+        try:
+            return [dict(row) for row in (db or self._db).execute(sql, params)]
+        except sqlite3.Error:
             return []
 
-    def save_appointments(self, appointments):
+    def _load_appointments_async(self, callback, since=None, until=None):
+        # Query on the I/O worker and hand the rows to callback on the Tk thread. The future is
+        # polled from the Tk side so the worker never has to call into Tk itself.
+        future = self._io_executor.submit(self._load_appointments_worker, since, until)
+
+        def poll():
+            if future.done():
+                callback(future.result())
+            else:
+                self.root.after(self.IO_POLL_MS, poll)
+
+        self.root.after(self.IO_POLL_MS, poll)
+
+    def _load_appointments_worker(self, since, until):
+        # runs on the I/O worker thread; sqlite connections are bound to their creating thread
+        if self._reader_db is None:
+            try:
+                self._reader_db = self._connect_appointments_db()
+            except sqlite3.Error:
+                return []
+        return self.load_appointments(since, until, db=self._reader_db)
+
+    def _close_reader_db(self):
+        if self._reader_db is not None:
+            self._reader_db.close()
+            self._reader_db = None
+
+    def _write_appointments(self, sql, params):
+        try:
+            with self._db:
+                cur = self._db.execute(sql, params)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to save appointments:\n{e}")
+            return None
+        self._appt_dirty = True
+        self._schedule_flush()
+        return cur
+
+    def add_appointment(self, appt):
+        self._write_appointments("INSERT INTO appointments (id, name, phone, date) VALUES (:id, :name, :phone, :date)", appt)
+
+    def update_appointment(self, appt):
+        cur = self._write_appointments("UPDATE appointments SET name = :name, phone = :phone, date = :date WHERE id = :id", appt)
+        if cur is not None and cur.rowcount == 0:
+            # fallback: append as new
+            self.add_appointment(appt)
+
+    def delete_appointment(self, appt_id):
+        self._write_appointments("DELETE FROM appointments WHERE id = ?", (appt_id,))
+
+    def _flush_appts(self):
+        if not self._appt_dirty:
+            return
         try:
-            with open(self.APPOINTMENTS_FILE, "w", encoding="utf-8") as f:
-                json.dump(appointments, f, indent=4)
+            # queried directly rather than via load_appointments, so a database error
+            # keeps the store dirty and the previous backup in place instead of exporting []
+            rows = [dict(row) for row in self._db.execute("SELECT id, name, phone, date FROM appointments ORDER BY date, rowid")]
+            if (self._appt_import_pending and os.path.exists(self.APPOINTMENTS_FILE)
+                    and not os.path.exists(self.APPOINTMENTS_LEGACY_FILE)):
+                # the legacy file was never imported; keep it for the next start instead of overwriting it
+                os.replace(self.APPOINTMENTS_FILE, self.APPOINTMENTS_LEGACY_FILE)
+            self._atomic_write_json(self.APPOINTMENTS_FILE, rows)
+            self._appt_dirty = False
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save appointments:\n{e}")
 
@@ -484,21 +782,18 @@ class ClinicApp:
             if not name or not phone or not date_str:
                 messagebox.showerror("Input Error", "Please fill all fields.")
                 return
-            try:
-                appt_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                if appt_date < datetime.now().date():
-                    messagebox.showerror("Input Error", "Appointment date cannot be in the past.")
-                    return
-            except ValueError:
+            if not _is_iso_date(date_str):
                 messagebox.showerror("Input Error", "Invalid date format. Use YYYY-MM-DD.")
                 return
-            appointments = self.load_appointments()
-            appointments.append({
+            if date_str < date.today().isoformat():
+                messagebox.showerror("Input Error", "Appointment date cannot be in the past.")
+                return
+            self.add_appointment({
+                "id": uuid.uuid4().hex,
                 "name": name,
                 "phone": phone,
                 "date": date_str
             })
-            self.save_appointments(appointments)
             messagebox.showinfo("Success", f"Appointment booked for {name} on {date_str}")
             popup.destroy()
 
@@ -506,13 +801,14 @@ class ClinicApp:
         btn_save.grid(row=3, column=0, columnspan=2, pady=12)
 
     def check_appointments_reminder(self):
-        appointments = self.load_appointments()
-        tomorrow = datetime.now().date() + timedelta(days=1)
-        due_appointments = [appt for appt in appointments if appt.get("date") == tomorrow.strftime("%Y-%m-%d")]
+        tomorrow = date.today() + timedelta(days=1)
+        self._load_appointments_async(self._show_appointments_reminder, since=tomorrow, until=tomorrow)
+
+    def _show_appointments_reminder(self, due_appointments):
         if due_appointments:
             msg_lines = ["Appointments due tomorrow:"]
             for appt in due_appointments:
-                msg_lines.append(f"- {appt.get('name')} (Phone: {appt.get('phone')}) on {appt.get('date')}")
+                msg_lines.append(f"- {appt['name']} (Phone: {appt['phone']}) on {appt['date']}")
             try:
                 messagebox.showinfo("Appointment Reminder", "\n".join(msg_lines))
             except Exception:
@@ -522,28 +818,19 @@ class ClinicApp:
     # View / Search / Edit / Delete appointments
     # --------------------
     def view_appointments(self):
-        appointments = self.load_appointments()
-        if not appointments:
-            messagebox.showinfo("Appointments", "No appointments found.")
-            return
-
-        today = datetime.now().date()
-        # keep only today or future
-        upcoming = []
-        for appt in appointments:
-            try:
-                appt_date = datetime.strptime(appt.get("date", ""), "%Y-%m-%d").date()
-                if appt_date >= today:
-                    upcoming.append(appt.copy())
-            except Exception:
-                continue
-
+        # keep only today or future, already in chronological order
+        upcoming = self.load_appointments(since=date.today())
         if not upcoming:
-            messagebox.showinfo("Appointments", "No upcoming appointments.")
+            try:
+                any_saved = self._db.execute("SELECT 1 FROM appointments LIMIT 1").fetchone() is not None
+            except sqlite3.Error:
+                any_saved = False
+            if not any_saved:
+                messagebox.showinfo("Appointments", "No appointments found.")
+            else:
+                messagebox.showinfo("Appointments", "No upcoming appointments.")
             return
 
-        upcoming.sort(key=lambda x: x.get("date"))
-
         popup = tk.Toplevel(self.root)
         popup.title("Upcoming Appointments")
         popup.geometry("620x480")
@@ -569,130 +856,197 @@ class ClinicApp:
         scrollbar.pack(side="right", fill="y")
         listbox.pack(side="left", expand=True, fill="both")
 
-        def populate_list(filtered_list):
-            listbox.delete(0, tk.END)
-            for appt in filtered_list:
-                listbox.insert(tk.END, f"{appt.get('date')}  |  {appt.get('name')}  |  {appt.get('phone')}")
+        # per-popup state shared by the handlers below, which are bound with partial
+        view = {
+            "popup": popup,
+            "listbox": listbox,
+            "search_var": search_var,
+            "upcoming": upcoming,
+            # rows currently shown in the listbox, in display order
+            "shown": [],
+            # pending debounced search for this popup
+            "search_after_id": None,
+            # pending reload after Refresh, coalesced across a burst of clicks
+            "refresh_after_id": None,
+        }
 
         # initial populate
-        populate_list(upcoming)
-
-        # search function
-        def search_appointments(*args):
-            q = search_var.get().strip().lower()
-            if not q:
-                populate_list(upcoming)
-                return
-            filtered = [appt for appt in upcoming if q in appt.get("name", "").lower() or q in appt.get("phone", "")]
-            populate_list(filtered)
-
-        search_var.trace_add("write", search_appointments)
+        self._populate_appointment_list(view, upcoming)
 
-        # delete selected
-        def delete_selected():
-            sel = listbox.curselection()
-            if not sel:
-                messagebox.showwarning("No Selection", "Please select an appointment to delete.")
-                return
-            index = sel[0]
-            # compute current filtered list
-            q = search_var.get().strip().lower()
-            current_list = [appt for appt in upcoming if q in appt.get("name", "").lower() or q in appt.get("phone", "")]
-            if index >= len(current_list):
-                return
-            appt_to_delete = current_list[index]
-            # remove from saved appointments
-            saved = self.load_appointments()
-            # remove the first matching item with same name+phone+date
-            for i, a in enumerate(saved):
-                if a.get("name") == appt_to_delete.get("name") and a.get("phone") == appt_to_delete.get("phone") and a.get("date") == appt_to_delete.get("date"):
-                    del saved[i]
-                    break
-            self.save_appointments(saved)
-            # update upcoming and UI
-            upcoming.remove(appt_to_delete)
-            search_appointments()
-            messagebox.showinfo("Deleted", f"Appointment for {appt_to_delete['name']} on {appt_to_delete['date']} deleted.")
-
-        # edit selected
-        def edit_selected():
-            sel = listbox.curselection()
-            if not sel:
-                messagebox.showwarning("No Selection", "Please select an appointment to edit.")
-                return
-            index = sel[0]
-            q = search_var.get().strip().lower()
-            current_list = [appt for appt in upcoming if q in appt.get("name", "").lower() or q in appt.get("phone", "")]
-            if index >= len(current_list):
-                return
-            appt_to_edit = current_list[index]
-
-            # Edit date
-            new_date_str = simpledialog.askstring("Edit Date", f"Enter new date (YYYY-MM-DD) [Current: {appt_to_edit['date']}]:", parent=popup)
-            if new_date_str:
-                try:
-                    new_date = datetime.strptime(new_date_str, "%Y-%m-%d").date()
-                    if new_date < datetime.now().date():
-                        messagebox.showerror("Invalid Date", "Appointment date cannot be in the past.")
-                        return
-                    appt_to_edit["date"] = new_date_str
-                except Exception:
-                    messagebox.showerror("Invalid Date", "Please enter a valid date in YYYY-MM-DD format.")
-                    return
-
-            # Edit phone
-            new_phone = simpledialog.askstring("Edit Phone", f"Enter new phone [Current: {appt_to_edit['phone']}]:", parent=popup)
-            if new_phone:
-                appt_to_edit["phone"] = new_phone
-
-            # Save changes to the persisted appointments (match by previous unique triple)
-            saved = self.load_appointments()
-            for i, a in enumerate(saved):
-                if a.get("name") == appt_to_edit.get("name") and a.get("date") == a.get("date") and a.get("phone") == a.get("phone"):
-                    # this logic may not find exact match in mutated case; safer approach: find by name+old date+old phone from current_list before edit
-                    pass
-
-            # Safer: find by name and any date/phone among saved and update the first occurrence that matches name
-            updated = False
-            for i, a in enumerate(saved):
-                if a.get("name") == appt_to_edit.get("name"):
-                    saved[i] = {"name": appt_to_edit["name"], "phone": appt_to_edit["phone"], "date": appt_to_edit["date"]}
-                    updated = True
-                    break
-
-            if not updated:
-                # fallback: append as new
-                saved.append({"name": appt_to_edit["name"], "phone": appt_to_edit["phone"], "date": appt_to_edit["date"]})
-
-            self.save_appointments(saved)
-
-            # refresh upcoming list (rebuild)
-            # reload from saved and re-filter today+
-            new_upcoming = []
-            saved2 = self.load_appointments()
-            for ap in saved2:
-                try:
-                    d = datetime.strptime(ap.get("date", ""), "%Y-%m-%d").date()
-                    if d >= datetime.now().date():
-                        new_upcoming.append(ap.copy())
-                except Exception:
-                    continue
-            # replace upcoming with new list sorted
-            upcoming.clear()
-            upcoming.extend(sorted(new_upcoming, key=lambda x: x.get("date")))
-            search_appointments()
-            messagebox.showinfo("Updated", f"Appointment updated for {appt_to_edit['name']}.")
+        search_var.trace_add("write", partial(self._schedule_appointment_search, view))
 
         # Buttons frame
         frame_btns = ttk.Frame(popup)
         frame_btns.pack(pady=8)
-        btn_delete = ttk.Button(frame_btns, text="Delete Selected", command=delete_selected)
+        btn_delete = ttk.Button(frame_btns, text="Delete Selected", command=partial(self._delete_selected_appointment, view))
         btn_delete.pack(side="left", padx=6)
-        btn_edit = ttk.Button(frame_btns, text="Edit Selected", command=edit_selected)
+        btn_edit = ttk.Button(frame_btns, text="Edit Selected", command=partial(self._edit_selected_appointment, view))
         btn_edit.pack(side="left", padx=6)
+        btn_refresh = ttk.Button(frame_btns, text="Refresh", command=partial(self._refresh_upcoming, view))
+        btn_refresh.pack(side="left", padx=6)
         btn_close = ttk.Button(frame_btns, text="Close", command=popup.destroy)
         btn_close.pack(side="left", padx=6)
 
+    @staticmethod
+    def _format_appointment(appt):
+        return f"{appt['date']}  |  {appt['name']}  |  {appt['phone']}"
+
+    @staticmethod
+    def _appointment_matches(q, appt):
+        # rows come from the appointments table, so every column is present
+        return not q or q in appt["name"].lower() or q in appt["phone"]
+
+    def _populate_appointment_list(self, view, filtered_list):
+        view["shown"][:] = filtered_list
+        listbox = view["listbox"]
+        listbox.delete(0, tk.END)
+        listbox.insert(tk.END, *[self._format_appointment(appt) for appt in filtered_list])
+
+    # search function
+    def _search_appointments(self, view):
+        upcoming = view["upcoming"]
+        q = view["search_var"].get().strip().lower()
+        if not q:
+            self._populate_appointment_list(view, upcoming)
+            return
+        filtered = [appt for appt in upcoming if self._appointment_matches(q, appt)]
+        self._populate_appointment_list(view, filtered)
+
+    def _patch_appointment_row(self, view, index, appt, moved):
+        # update the one listbox row for an edited appointment instead of rebuilding the list
+        # `index` is None when the row is not currently shown
+        shown = view["shown"]
+        listbox = view["listbox"]
+        if index is not None:
+            shown.pop(index)
+            listbox.delete(index)
+        if not self._appointment_matches(view["search_var"].get().strip().lower(), appt):
+            return
+        if moved or index is None:
+            # same slot insort gave it in upcoming: after rows with the same date
+            index = bisect_right(shown, appt["date"], key=_BY_DATE)
+        shown.insert(index, appt)
+        listbox.insert(index, self._format_appointment(appt))
+
+    # debounce: filter once typing pauses instead of on every keystroke
+    def _run_appointment_search(self, view):
+        view["search_after_id"] = None
+        if view["listbox"].winfo_exists():
+            self._search_appointments(view)
+
+    def _schedule_appointment_search(self, view, *args):
+        if view["search_after_id"] is not None:
+            self.root.after_cancel(view["search_after_id"])
+        view["search_after_id"] = self.root.after(self.SEARCH_DELAY_MS, self._run_appointment_search, view)
+
+    # coalesce Refresh clicks so a burst only reloads and rebuilds the list once
+    def _run_appointment_refresh(self, view):
+        view["refresh_after_id"] = None
+        if view["listbox"].winfo_exists():
+            self._load_appointments_async(partial(self._apply_upcoming_refresh, view), since=date.today())
+
+    def _schedule_appointment_refresh(self, view):
+        if view["refresh_after_id"] is not None:
+            self.root.after_cancel(view["refresh_after_id"])
+        view["refresh_after_id"] = self.root.after(self.REFRESH_DELAY_MS, self._run_appointment_refresh, view)
+
+    def _selected_appointment(self, view, action):
+        sel = view["listbox"].curselection()
+        if not sel:
+            messagebox.showwarning("No Selection", f"Please select an appointment to {action}.")
+            return None
+        index = sel[0]
+        # use what is displayed; a debounced search may not have run yet
+        shown = view["shown"]
+        if index >= len(shown):
+            return None
+        return index, shown[index]
+
+    # delete selected
+    def _delete_selected_appointment(self, view):
+        selected = self._selected_appointment(view, "delete")
+        if selected is None:
+            return
+        index, appt_to_delete = selected
+        # remove from saved appointments by id
+        self.delete_appointment(appt_to_delete["id"])
+        # update upcoming and drop just that listbox row
+        view["upcoming"].remove(appt_to_delete)
+        view["shown"].pop(index)
+        view["listbox"].delete(index)
+        messagebox.showinfo("Deleted", f"Appointment for {appt_to_delete['name']} on {appt_to_delete['date']} deleted.")
+
+    # edit selected
+    def _edit_selected_appointment(self, view):
+        selected = self._selected_appointment(view, "edit")
+        if selected is None:
+            return
+        _, appt_to_edit = selected
+        popup = view["popup"]
+        appt_id = appt_to_edit["id"]
+
+        # Edit date
+        new_date_str = simpledialog.askstring("Edit Date", f"Enter new date (YYYY-MM-DD) [Current: {appt_to_edit['date']}]:", parent=popup)
+        if new_date_str:
+            if not _is_iso_date(new_date_str):
+                messagebox.showerror("Invalid Date", "Please enter a valid date in YYYY-MM-DD format.")
+                return
+            if new_date_str < date.today().isoformat():
+                messagebox.showerror("Invalid Date", "Appointment date cannot be in the past.")
+                return
+
+        # Edit phone
+        new_phone = simpledialog.askstring("Edit Phone", f"Enter new phone [Current: {appt_to_edit['phone']}]:", parent=popup)
+
+        # the dialogs run a nested event loop, so a debounced search or a Refresh may have
+        # rebuilt shown and upcoming meanwhile; find the row again by id before touching them
+        shown = view["shown"]
+        upcoming = view["upcoming"]
+        index = next((i for i, appt in enumerate(shown) if appt["id"] == appt_id), None)
+        if index is not None:
+            appt_to_edit = shown[index]
+        old_date = appt_to_edit["date"]
+        # position in the date-sorted upcoming list, found before the row is mutated;
+        # only rows sharing the old date are scanned
+        pos = bisect_left(upcoming, old_date, key=_BY_DATE)
+        end = bisect_right(upcoming, old_date, lo=pos, key=_BY_DATE)
+        while pos < end and upcoming[pos]["id"] != appt_id:
+            pos += 1
+        if pos == end:
+            pos = None
+        else:
+            appt_to_edit = upcoming[pos]
+
+        if new_date_str:
+            appt_to_edit["date"] = new_date_str
+        if new_phone:
+            appt_to_edit["phone"] = new_phone
+
+        # Save changes to the persisted appointment with the same id
+        self.update_appointment(appt_to_edit)
+
+        # keep upcoming sorted in place: move only the edited row, and only if its date changed
+        moved = appt_to_edit["date"] != old_date
+        if moved and pos is not None:
+            upcoming.pop(pos)
+            insort(upcoming, appt_to_edit, key=_BY_DATE)
+        self._patch_appointment_row(view, index, appt_to_edit, moved)
+        messagebox.showinfo("Updated", f"Appointment updated for {appt_to_edit['name']}.")
+
+    # refresh: reload from saved and re-filter today+
+    def _refresh_upcoming(self, view):
+        self._schedule_appointment_refresh(view)
+
+    def _apply_upcoming_refresh(self, view, rows):
+        if not view["listbox"].winfo_exists():
+            return
+        # swap upcoming and redraw shown/listbox in the same step, so a selection never
+        # maps onto rows from a different load
+        upcoming = view["upcoming"]
+        upcoming.clear()
+        upcoming.extend(rows)
+        self._search_appointments(view)
+
     # --------------------
     # End of class
     # --------------------